@@ -49,6 +49,7 @@ def init():
 
 def animate(i):
 	current_t = i*0.002
+	# integration continues from the state of the previous frame
 	c.simulate(dt=1e-4, t_final=current_t, noreturn=True)
 	im.set_data(c.p)
 	annot.set_text('Time: {:.3f}'.format(current_t))
@@ -38,7 +38,6 @@ g['Exact'] = gillespie.single_substrate(kf=kf, kb=kb, kcat=kcat, ET=ET, ST=ST)
 g['tQSSA'] = gillespie.single_substrate_tqssa(kM=kM, kcat=kcat, ET=ET, ST=ST)
 g['sQSSA'] = gillespie.single_substrate_sqssa(kM=kM, kcat=kcat, ET=ET, ST=ST)
 
-hists = {'Exact': [], 'tQSSA': [], 'sQSSA': []}
 n_simulations = 5000
 init_conditions = {'Exact': [0, 0], 'tQSSA': [0], 'sQSSA': [0]}
 max_t = 9
@@ -46,29 +45,29 @@ max_t = 9
 ndiv = max_t*50 + 1
 bins = np.linspace(0, max_t, ndiv)
 
-for s in sim:
-	for _ in range(n_simulations):
-		g[s].x = init_conditions[s]
-		g[s].t = 0
+# products formed in each time bin, for each variant and simulation
+dhists = np.empty((len(sim), n_simulations, ndiv-1))
+
+for k, s in enumerate(sim):
+	for i in range(n_simulations):
+		g[s].reset(init_conditions[s])
 		x, t = g[s].simulate(t_final=max_t)
 		dprods = np.diff(x[:,g[s].species.P])
-		dhist, _ = np.histogram(t[1:], bins, weights=dprods)
-		hists[s].append(np.cumsum(dhist))
-	hists[s] = np.array(hists[s])
+		# bins are uniformly spaced, so the bin index of each event can be computed directly
+		idx = np.minimum((t[1:] * ((ndiv-1) / max_t)).astype(np.int64), ndiv-2)
+		dhists[k,i] = np.bincount(idx, weights=dprods, minlength=ndiv-1)
 
-avePs = {}
-msqPs = {}
-for s in sim:
-	avePs[s] = np.sum(hists[s], axis=0) / hists[s].shape[0]
-	msqPs[s] = np.sum(hists[s]**2, axis=0) / hists[s].shape[0]
+# statistics of the products count for all variants at once
+hists = np.cumsum(dhists, axis=2)
+avePs = np.mean(hists, axis=1)
+msqPs = np.mean(hists**2, axis=1)
+errors = np.sqrt(np.maximum(msqPs - avePs**2, 0))
 
 t = (bins[1:] + bins[:-1])/2
 
-for s in sim:
-	error = np.sqrt(np.maximum(msqPs[s] - avePs[s]**2, 0))
-
-	plt.plot(t, avePs[s], label=s)
-	plt.fill_between(t, 0, error, alpha=.3)
+for k, s in enumerate(sim):
+	plt.plot(t, avePs[k], label=s)
+	plt.fill_between(t, 0, errors[k], alpha=.3)
 
 plt.ylim(0)
 plt.xlabel('Time')
@@ -22,14 +22,22 @@ import sys
 
 sys.path.append('../pybind')
 
-import gillespie
-
-g = gillespie.single_substrate(kf=10, kb=9, kcat=1, ET=10, ST=9)
-
-x, t = g.simulate()
-
-plt.plot(t, x[:,g.species.C], drawstyle='steps-post', label='C')
-plt.plot(t, x[:,g.species.P], drawstyle='steps-post', label='P')
+try:
+	import gillespie
+except ImportError:
+	gillespie = None
+
+if gillespie is not None:
+	g = gillespie.single_substrate(kf=10, kb=9, kcat=1, ET=10, ST=9)
+	x, t = g.simulate()
+	C, P = g.species.C, g.species.P
+else:
+	# the compiled module is not available: fall back to the Numba implementation
+	from gillespie_numba import ssa_single_substrate, C, P
+	x, t = ssa_single_substrate(kf=10, kb=9, kcat=1, ET=10, ST=9)
+
+plt.plot(t, x[:,C], drawstyle='steps-post', label='C')
+plt.plot(t, x[:,P], drawstyle='steps-post', label='P')
 
 plt.xlabel('Time')
 plt.ylabel('Population')
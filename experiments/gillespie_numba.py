@@ -0,0 +1,98 @@
+'''
+    Stochastic enzyme kinetics: Gillespie algorithm using Numba (pure Python fallback)
+    Copyright (C) 2023 Alessandro Lo Cuoco (alessandro.locuoco@gmail.com)
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+# Reference implementation of the stochastic simulation algorithm for the
+# single-substrate enzyme kinetics, JIT-compiled with Numba. It can be used
+# for benchmarking or when the compiled `gillespie` module is not available.
+
+import numpy as np
+from numba import njit
+
+# species indices (same as gillespie.single_substrate.species)
+C = 0
+P = 1
+
+@njit(cache=True)
+def ssa_single_substrate(kf, kb, kcat, ET, ST, t_final=0., max_steps=10_000_000, seed=-1):
+	'''
+	Simulate the single-substrate enzyme kinetics starting from C = P = 0 at time 0,
+	for max_steps steps or until t >= t_final (set t_final to 0 or negative number for infinity).
+	Set seed to a non-negative integer for reproducible results.
+	Return the population numbers (shape: (n_states, 2)) and the times (shape: (n_states,)),
+	initial and final state included, as gillespie.single_substrate.simulate does.
+	'''
+	if seed >= 0:
+		np.random.seed(seed)
+
+	capacity = 1024
+	xs = np.empty((capacity, 2), dtype=np.int64)
+	ts = np.empty(capacity, dtype=np.float64)
+
+	c = 0
+	p = 0
+	t = 0.
+	n = 0
+
+	for _ in range(max_steps):
+		if n == capacity:
+			capacity *= 2
+			xs_new = np.empty((capacity, 2), dtype=np.int64)
+			ts_new = np.empty(capacity, dtype=np.float64)
+			xs_new[:n] = xs[:n]
+			ts_new[:n] = ts[:n]
+			xs = xs_new
+			ts = ts_new
+		xs[n, C] = c
+		xs[n, P] = p
+		ts[n] = t
+		n += 1
+
+		a_f = kf * ((ET - c) * (ST - c - p))
+		a_b = kb * c
+		a_cat = kcat * c
+		a_tot = a_f + a_b + a_cat
+
+		if a_tot == 0:
+			break # no reaction is possible
+
+		r1 = np.random.random()
+		r2 = np.random.random()
+
+		tau = -np.log1p(-r1) / a_tot
+
+		if t + tau > t_final and t_final > 0:
+			break # reaction would be performed after t_final
+
+		t += tau
+		if a_f > r2*a_tot:
+			c += 1
+		elif a_f + a_b > r2*a_tot:
+			c -= 1
+		else:
+			c -= 1
+			p += 1
+
+	x_arr = np.empty((n+1, 2), dtype=np.int64)
+	t_arr = np.empty(n+1, dtype=np.float64)
+	x_arr[:n] = xs[:n]
+	t_arr[:n] = ts[:n]
+	x_arr[n, C] = c
+	x_arr[n, P] = p
+	t_arr[n] = t
+
+	return x_arr, t_arr
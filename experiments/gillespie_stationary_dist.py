@@ -49,6 +49,16 @@ SP_hats = {}
 weights = {}
 init_conditions = {'Exact': [ST//2, 0, 0], 'tQSSA': [ST//2], 'sQSSA': [ST//2]}
 max_t = 5000
+# set to a positive maximum leap time (e.g., 1) to simulate the exact model with the
+# (approximate) tau-leaping method instead of the exact stochastic simulation algorithm.
+# The leap time is chosen adaptively: with these population numbers leaping is rarely
+# convenient, so it mostly falls back to exact steps and runs about as fast as without it
+tau_leap = None
+# to save memory, the exact model stores only one state every (kfe+kbe+kfd+kbd)/(ke+kd) steps.
+# This is an approximation: each stored value of SP_hat = SP + CP is weighted with the time spanned
+# by all the skipped steps. Since SP_hat is changed only by the (slower) catalytic reactions,
+# it is a close one, but the resulting distribution is not exactly that of the full trajectory
+n_samplings = {'Exact': ceil((kfe+kbe+kfd+kbd)/(ke+kd)), 'tQSSA': 1, 'sQSSA': 1}
 
 tracked_species = {
 	'Exact': np.array([g['Exact'].species.SP, g['Exact'].species.CP], dtype=int),
@@ -57,9 +67,11 @@ tracked_species = {
 }
 
 for s in sim:
-	g[s].x = init_conditions[s]
-	g[s].t = 0
-	x, t = g[s].simulate(t_final=max_t)
+	g[s].reset(init_conditions[s])
+	if s == 'Exact' and tau_leap is not None:
+		x, t = g[s].simulate_tau_leap(t_final=max_t, tau=tau_leap, n_sampling=n_samplings[s])
+	else:
+		x, t = g[s].simulate(t_final=max_t, n_sampling=n_samplings[s])
 	SP_hats[s] = np.sum(x[:-1,tracked_species[s]], axis=1)
 	weights[s] = np.diff(t)
 
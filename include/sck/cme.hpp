@@ -197,7 +197,7 @@ namespace cme
 
 		template <typename Integ>
 		[[maybe_unused]] std::size_t simulate(Integ& integ, T dt, T t_final)
-		// simulate until t >= t_final
+		// simulate until t >= t_final, starting from the current state (p, t)
 		// dt is the integration step
 		// return the number of steps
 		{
@@ -209,7 +209,7 @@ namespace cme
 
 		template <typename Integ>
 		[[maybe_unused]] std::size_t simulate(Integ& integ, list_of_states<T>& states, T dt, T t_final, std::size_t n_sampling = 1)
-		// simulate until t >= t_final, and save the states inside a list (initial and final states are included)
+		// simulate until t >= t_final, starting from the current state (p, t), and save the states inside a list (initial and final states are included)
 		// dt is the integration step
 		// n_sampling is the number of integration steps for each sampling point
 		// return the number of steps
@@ -17,7 +17,6 @@
 #ifndef SEK_GILLESPIE
 #define SEK_GILLESPIE
 
-#include <random> // uniform_real_distribution, mt19937_64
 #include <valarray>
 #include <concepts> // floating_point
 #include <functional> // function
@@ -25,12 +24,79 @@
 #include <string> // string, to_string
 #include <vector>
 #include <array>
-#include <cmath> // log, sqrt
+#include <limits> // numeric_limits
+#include <algorithm> // min
+#include <cmath> // log1p, exp, log, sqrt, fabs, floor, lgamma
+#include <cstdint> // uint32_t, uint64_t, uint_fast64_t
+
+#ifdef _OPENMP
+#include <omp.h> // omp_get_max_threads
+#endif
 
 #include "tensor.hpp"
 
 namespace gillespie
 {
+	class pcg32
+	// PCG32 random number generator (XSH RR variant: 64-bit state, 32-bit output), see M. E. O'Neill,
+	// "PCG: A Family of Simple Fast Space-Efficient Statistically Good Algorithms for Random Number Generation", 2014.
+	// it satisfies the UniformRandomBitGenerator requirements
+	{
+		std::uint64_t state = 0x853c49e6748fea9bull, inc = 0xda3e39cb94b95bdbull;
+
+	public:
+
+		using result_type = std::uint32_t;
+
+		pcg32() noexcept = default;
+
+		explicit pcg32(std::uint64_t s, std::uint64_t seq = 0xda3e39cb94b95bdbull >> 1) noexcept
+		// constructor
+		//	s: seed (initial state)
+		//	seq: stream selector
+		{
+			seed(s, seq);
+		}
+
+		void seed(std::uint64_t s, std::uint64_t seq = 0xda3e39cb94b95bdbull >> 1) noexcept
+		{
+			state = 0;
+			inc = (seq << 1) | 1;
+			(*this)();
+			state += s;
+			(*this)();
+		}
+
+		static constexpr result_type min() noexcept
+		{
+			return 0;
+		}
+
+		static constexpr result_type max() noexcept
+		{
+			return 0xffffffffu;
+		}
+
+		result_type operator()() noexcept
+		{
+			std::uint64_t old_state = state;
+			state = old_state * 6364136223846793005ull + inc;
+			result_type xorshifted = result_type(((old_state >> 18) ^ old_state) >> 27);
+			result_type rot = result_type(old_state >> 59);
+			return (xorshifted >> rot) | (xorshifted << ((-rot) & 31));
+		}
+	};
+
+	constexpr std::uint64_t splitmix64(std::uint64_t seed, std::uint64_t i) noexcept
+	// return the i-th output of the SplitMix64 generator initialized with seed (S. Vigna),
+	// used to derive independent seeds from a single one
+	{
+		std::uint64_t z = seed + (i + 1) * 0x9e3779b97f4a7c15ull;
+		z = (z ^ (z >> 30)) * 0xbf58476d1ce4e5b9ull;
+		z = (z ^ (z >> 27)) * 0x94d049bb133111ebull;
+		return z ^ (z >> 31);
+	}
+
 	template <std::size_t N_s, std::floating_point T = double>
 	struct list_of_states
 	{
@@ -46,8 +112,71 @@ namespace gillespie
 	class gillespie
 	// Gillespie general algorithm
 	{
-		std::mt19937_64 gen; // random number generator (64-bit Mersenne Twister)
-		std::uniform_real_distribution<T> u_dist = std::uniform_real_distribution<T>(0, 1);
+		pcg32 gen; // random number generator
+
+		T uniform() noexcept
+		// return a uniformly distributed random number in [0, 1), using all the bits of the mantissa
+		{
+			if constexpr (std::numeric_limits<T>::digits <= 32)
+				return T(gen() >> (32 - std::numeric_limits<T>::digits)) / T(1ull << std::numeric_limits<T>::digits);
+			else
+			{
+				std::uint64_t hi = gen(); // two separate statements, so that the order of the draws is well-defined
+				std::uint64_t lo = gen();
+				return T(((hi << 32) | lo) >> 11) * T(0x1p-53);
+			}
+		}
+
+		long long poisson(T mean)
+		// return a Poisson-distributed random number with the given mean
+		// for small means, use inversion by sequential search (a single uniform random number is drawn)
+		// for large means, use the transformed rejection method with squeeze (PTRS), see W. Hormann,
+		// "The transformed rejection method for generating Poisson random variables", 1993.
+		// Unlike std::poisson_distribution, it does not need a setup that depends on the mean
+		// other than a square root and a logarithm, so that it is fast even if the mean changes at every call
+		{
+			using std::exp;
+			using std::log;
+			using std::sqrt;
+			using std::fabs;
+			using std::floor;
+			using std::lgamma;
+
+			if (mean < 10)
+			{
+				T u = uniform();
+				T p = exp(-mean);
+				T cdf = p;
+				long long k = 0;
+				while (u > cdf && p > 0)
+				{
+					++k;
+					p *= mean / k;
+					cdf += p;
+				}
+				return k;
+			}
+
+			T log_mean = log(mean);
+			T b = T(0.931) + T(2.53)*sqrt(mean);
+			T a = T(-0.059) + T(0.02483)*b;
+			T inv_alpha = T(1.1239) + T(1.1328)/(b - T(3.4));
+			T v_r = T(0.9277) - T(3.6224)/(b - 2);
+
+			for (;;)
+			{
+				T u = uniform() - T(0.5);
+				T v = uniform();
+				T us = T(0.5) - fabs(u);
+				T k = floor((2*a/us + b)*u + mean + T(0.43));
+				if (us >= T(0.07) && v <= v_r)
+					return static_cast<long long>(k); // squeeze acceptance
+				if (k < 0 || (us < T(0.013) && v > us))
+					continue;
+				if (log(v*inv_alpha / (a/(us*us) + b)) <= -mean + k*log_mean - lgamma(k + 1))
+					return static_cast<long long>(k);
+			}
+		}
 
 	protected:
 
@@ -66,39 +195,79 @@ namespace gillespie
 
 		virtual ~gillespie() = default;
 
+		void reset(const physics::vec<long long, N_s>& x0) noexcept
+		// set the population numbers to x0 and the time to 0
+		{
+			x = x0;
+			t = 0;
+		}
+
+		void seed(std::uint_fast64_t s)
+		// seed the random number generator
+		{
+			gen.seed(s);
+		}
+
 		static constexpr std::size_t default_max_steps() noexcept
 		{
 			return 10'000'000;
 		}
 
+		T a(std::size_t i) const
+		// propensity functions
+		//	i: reaction channel index
+		// throw std::domain_error if the current population numbers x are not consistent
+		{
+			check_state();
+			return propensity(i);
+		}
+
 		T total_propensity() const
 		// return the total propensity, i.e., the sum of all propensity functions
 		// calculated at the current population numbers x.
 		{
+			std::array<T, N_r> a_arr;
+			propensities(a_arr);
+
 			T a_tot = 0;
 
 			for (std::size_t i = 0; i < N_r; ++i)
-				a_tot += a(i);
+				a_tot += a_arr[i];
 
 			return a_tot;
 		}
 
+		void propensities(std::array<T, N_r>& a_arr) const
+		// calculate all propensity functions at the current population numbers x,
+		// so that they can be used for both the total propensity and the choice of the reaction channel
+		// the consistency of x is checked only once for all reaction channels
+		{
+			check_state();
+			for (std::size_t i = 0; i < N_r; ++i)
+				a_arr[i] = propensity(i);
+		}
+
 		bool step(T t_final = 0)
 		// a single step of the stochastic simulation algorithm (Gillespie)
 		// return whether a reaction has been performed successfully before time t_final or not
 		// set t_final to 0 or negative number for infinity
 		{
-			using std::log;
+			using std::log1p;
 
-			T a_tot = total_propensity();
+			std::array<T, N_r> a_arr;
+			propensities(a_arr);
+
+			T a_tot = 0;
+			for (std::size_t i = 0; i < N_r; ++i)
+				a_tot += a_arr[i];
 
 			if (a_tot == 0)
 				return false; // no reaction is possible
 
-			T r1 = u_dist(gen);
-			T r2 = u_dist(gen);
+			T r1 = uniform();
+			T r2 = uniform();
 
-			T tau = -log(r1)/a_tot;
+			T tau = -log1p(-r1)/a_tot; // r1 is in [0, 1), so that 1 - r1 is never 0
 
 			if (t + tau > t_final && t_final > 0)
 				return false; // reaction would be performed after t_final
@@ -108,7 +277,7 @@ namespace gillespie
 			T a_accum = 0;
 			for (j = 0; j < N_r-1; ++j)
 			{
-				a_accum += a(j);
+				a_accum += a_arr[j];
 				if (a_accum > r2*a_tot)
 					break;
 			}
@@ -135,13 +304,17 @@ namespace gillespie
 		// n_sampling is the number of Gillespie algorithm steps for each sampling point
 		// if the total propensity gets to zero, the simulation will be terminated
 		{
+			// only the sampled states are stored, so that memory usage is proportional to the number of sampling points
+			std::size_t countdown = 0; // steps left before the next sampling point
 			for (std::size_t i = 0; i < max_steps && (t <= t_final || t_final <= 0); ++i)
 			{
-				if (i % n_sampling == 0)
+				if (countdown == 0)
 				{
 					states.x.push_back(x);
 					states.t.push_back(t);
+					countdown = n_sampling;
 				}
+				--countdown;
 				if (!step(t_final))
 					break;
 			}
@@ -149,11 +322,258 @@ namespace gillespie
 			states.t.push_back(t);
 		}
 
-		virtual T a(std::size_t i) const = 0;
-		// propensity functions
+		static constexpr T default_epsilon() noexcept
+		{
+			return T(0.03);
+		}
+
+		bool leap(T tau, T t_final = 0, T epsilon = default_epsilon())
+		// a single step of the tau-leaping method (approximate), with the leap time selected as in
+		// Y. Cao, D. T. Gillespie, L. R. Petzold, "Avoiding negative populations in explicit Poisson tau-leaping", 2005:
+		//	- a reaction channel is critical if firing it n_c = 10 times would give an inconsistent state.
+		//	  Critical channels fire at most once per leap, as in the stochastic simulation algorithm
+		//	- each non-critical channel j fires a Poisson-distributed number of times with mean a_j*tau', where
+		//	  tau' is the largest leap time for which the expected change of every propensity function is bounded
+		//	  by epsilon*a_0 (D. T. Gillespie, L. R. Petzold, "Improved leap-size selection for accelerated
+		//	  stochastic simulation", 2003). The derivatives of the propensity functions are calculated by finite
+		//	  differences along the stoichiometric vectors
+		//	- if tau' is smaller than a few times the mean time between reactions 1/a_0, leaping is not convenient
+		//	  and up to 100 steps of the stochastic simulation algorithm are performed instead
+		//	- if the resulting state is not consistent anyway, tau' is halved and the leap is repeated
+		// tau is the maximum leap time
+		// epsilon is the error control parameter (smaller is more accurate but slower)
+		// return whether the step has been performed successfully before time t_final or not
+		// set t_final to 0 or negative number for infinity
+		{
+			using std::fabs;
+			using std::log1p;
+			using std::min;
+
+			constexpr long long n_c = 10; // critical number of firings
+			constexpr T ssa_threshold = 10; // minimum leap time to use tau-leaping, in units of 1/a_0
+			constexpr std::size_t n_ssa = 100; // number of SSA steps when tau-leaping is not convenient
+
+			if (!(tau > 0))
+				throw std::domain_error("The leap time must be positive.");
+			if (!(epsilon > 0 && epsilon < 1))
+				throw std::domain_error("The error control parameter must be in (0, 1).");
+			if (t >= t_final && t_final > 0)
+				return false;
+
+			std::array<T, N_r> a_arr;
+			propensities(a_arr);
+
+			T a_tot = 0;
+			for (std::size_t i = 0; i < N_r; ++i)
+				a_tot += a_arr[i];
+
+			if (a_tot == 0)
+				return false; // no reaction is possible
+
+			std::array<bool, N_r> critical;
+			T a_crit = 0; // total propensity of critical channels
+			for (std::size_t j = 0; j < N_r; ++j)
+			{
+				critical[j] = a_arr[j] > 0 && !consistent(x + n_c * nu[j]);
+				if (critical[j])
+					a_crit += a_arr[j];
+			}
+
+			// mu[j] and sigma2[j] are the mean and the variance of the change of a_j per unit time
+			// due to the non-critical channels
+			std::array<T, N_r> mu{}, sigma2{};
+			const physics::vec<long long, N_s> x_old = x;
+			for (std::size_t k = 0; k < N_r; ++k)
+			{
+				if (a_arr[k] == 0 || critical[k])
+					continue;
+				x = x_old + nu[k]; // consistent, since k is not critical and the constraints are linear
+				for (std::size_t j = 0; j < N_r; ++j)
+				{
+					T f = propensity(j) - a_arr[j];
+					mu[j] += f * a_arr[k];
+					sigma2[j] += f*f * a_arr[k];
+				}
+			}
+			x = x_old;
+
+			T tau1 = tau;
+			T bound = epsilon * a_tot;
+			for (std::size_t j = 0; j < N_r; ++j)
+			{
+				if (mu[j] != 0)
+					tau1 = min(tau1, bound / fabs(mu[j]));
+				if (sigma2[j] != 0)
+					tau1 = min(tau1, bound*bound / sigma2[j]);
+			}
+
+			if (tau1 * a_tot < ssa_threshold)
+			{
+				for (std::size_t i = 0; i < n_ssa; ++i)
+					if (!step(t_final))
+						return false;
+				return true;
+			}
+
+			for (;;)
+			{
+				// a critical reaction fires if it happens before tau' (as in the stochastic simulation algorithm)
+				T dt = tau1;
+				bool fire_critical = false;
+				if (a_crit > 0)
+				{
+					T tau2 = -log1p(-uniform())/a_crit;
+					if (tau2 <= tau1)
+					{
+						dt = tau2;
+						fire_critical = true;
+					}
+				}
+				if (t + dt > t_final && t_final > 0)
+				{
+					dt = t_final - t; // stop exactly at t_final
+					fire_critical = false;
+				}
+
+				physics::vec<long long, N_s> y = x;
+				for (std::size_t j = 0; j < N_r; ++j)
+					if (a_arr[j] > 0 && !critical[j])
+						y += poisson(a_arr[j]*dt) * nu[j];
+				if (fire_critical)
+				{
+					// choose the critical channel as in the stochastic simulation algorithm
+					T r = uniform() * a_crit;
+					T a_accum = 0;
+					std::size_t j_last = 0;
+					for (std::size_t j = 0; j < N_r; ++j)
+					{
+						if (!critical[j])
+							continue;
+						j_last = j;
+						a_accum += a_arr[j];
+						if (a_accum > r)
+							break;
+					}
+					y += nu[j_last];
+				}
+				if (consistent(y))
+				{
+					x = y;
+					t += dt;
+					return true;
+				}
+				tau1 /= 2;
+			}
+		}
+
+		void simulate_tau_leap(T t_final, T tau, std::size_t max_steps = default_max_steps(), T epsilon = default_epsilon())
+		// simulate with the tau-leaping method for max_steps steps or until t >= t_final
+		// tau is the maximum leap time, epsilon is the error control parameter (see leap)
+		// set t_final to 0 or negative number for infinity
+		// if the total propensity gets to zero, the simulation will be terminated
+		{
+			if (!(tau > 0))
+				throw std::domain_error("The leap time must be positive.");
+			for (std::size_t i = 0; i < max_steps; ++i)
+				if (!leap(tau, t_final, epsilon))
+					break;
+		}
+
+		void simulate_tau_leap(list_of_states<N_s, T>& states, T t_final, T tau, std::size_t max_steps = default_max_steps(), std::size_t n_sampling = 1,
+			T epsilon = default_epsilon())
+		// simulate with the tau-leaping method for max_steps steps or until t >= t_final, and save the states
+		// inside a list (initial and final state are included)
+		// tau is the maximum leap time, epsilon is the error control parameter (see leap)
+		// set t_final to 0 or negative number for infinity
+		// n_sampling is the number of leaps for each sampling point
+		// if the total propensity gets to zero, the simulation will be terminated
+		{
+			if (!(tau > 0))
+				throw std::domain_error("The leap time must be positive.");
+			std::size_t countdown = 0; // leaps left before the next sampling point
+			for (std::size_t i = 0; i < max_steps; ++i)
+			{
+				if (countdown == 0)
+				{
+					states.x.push_back(x);
+					states.t.push_back(t);
+					countdown = n_sampling;
+				}
+				--countdown;
+				if (!leap(tau, t_final, epsilon))
+					break;
+			}
+			states.x.push_back(x);
+			states.t.push_back(t);
+		}
+
+		virtual bool consistent(const physics::vec<long long, N_s>& y) const noexcept
+		// return whether the population numbers y are non-negative
+		// models with constants of motion should also check that y is compatible with them
+		{
+			for (std::size_t i = 0; i < N_s; ++i)
+				if (y[i] < 0)
+					return false;
+			return true;
+		}
+
+	protected:
+
+		void check_state() const
+		// throw std::domain_error if the current population numbers x are not consistent
+		{
+			if (consistent(x))
+				return;
+			std::string state;
+			for (std::size_t i = 0; i < N_s; ++i)
+				state += (i == 0 ? "" : ", ") + std::to_string(x[i]);
+			throw std::domain_error("Current state " + state + " is incompatible with constants of motion.");
+		}
+
+		virtual T propensity(std::size_t i) const = 0;
+		// propensity functions, without checking the consistency of the current population numbers
 		//	i: reaction channel index
 	};
 
+	template <typename System, std::floating_point T = double>
+	void simulate_batch(const System& sys, std::vector<T>& completion_times, std::size_t n_simulations, const decltype(System::x)& x0,
+		T t_final = 0, std::size_t max_steps = System::default_max_steps(), std::uint_fast64_t seed = 0, [[maybe_unused]] int n_threads = 0)
+	// run n_simulations independent simulations, each one starting from population numbers x0 at time 0,
+	// and save their final times inside completion_times (which is resized to n_simulations)
+	// set t_final to 0 or negative number for infinity
+	// sys is copied by each thread, and the random number generator is seeded before each simulation
+	// with a seed derived from seed and the simulation index (through SplitMix64), so that the results
+	// are reproducible and do not depend on the number of threads
+	// n_threads is the number of OpenMP threads; set it to 0 or negative number to use the default number of threads
+	// (when compiled without OpenMP support, the simulations are performed serially)
+	{
+		System check = sys;
+		check.reset(x0);
+		check.total_propensity(); // throw here if x0 is incompatible with constants of motion
+
+		completion_times.resize(n_simulations);
+
+#ifdef _OPENMP
+		if (n_threads <= 0)
+			n_threads = omp_get_max_threads();
+		#pragma omp parallel num_threads(n_threads)
+#endif
+		{
+			System local = sys;
+
+#ifdef _OPENMP
+			#pragma omp for schedule(static)
+#endif
+			for (std::size_t i = 0; i < n_simulations; ++i)
+			{
+				local.seed(splitmix64(seed, i));
+				local.reset(x0);
+				local.simulate(t_final, max_steps);
+				completion_times[i] = local.t;
+			}
+		}
+	}
+
 	template <std::floating_point T = double>
 	class single_substrate : public gillespie<2, 3, T>
 	// Gillespie algorithm applied to single-substrate enzyme kinetics
@@ -187,14 +607,18 @@ namespace gillespie
 			nu[cat] = {-1, 1};
 		}
 
-		T a(std::size_t i) const final override
-		// propensity functions
+		bool consistent(const physics::vec<long long, num_species>& y) const noexcept final override
+		// return whether the population numbers y are non-negative and compatible with constants of motion
+		{
+			return base::consistent(y) && y[C] <= ET && y[C] + y[P] <= ST;
+		}
+
+	protected:
+
+		T propensity(std::size_t i) const final override
+		// propensity functions (the consistency of the population numbers is checked by the caller)
 		//	i: reaction channel index
 		{
-			if (x[C] > ET || x[C] + x[P] > ST)
-				throw std::domain_error("Current state "
-					+ std::to_string(x[C]) + ", " + std::to_string(x[P])
-					+ " is incompatible with constants of motion.");
 			switch (i)
 			{
 				case f:
@@ -241,16 +665,20 @@ namespace gillespie
 			nu[0] = {1};
 		}
 
-		T a(std::size_t i) const final override
-		// propensity functions
+		bool consistent(const physics::vec<long long, num_species>& y) const noexcept final override
+		// return whether the population numbers y are non-negative and compatible with constants of motion
+		{
+			return base::consistent(y) && y[P] <= ST;
+		}
+
+	protected:
+
+		T propensity(std::size_t i) const final override
+		// propensity functions (the consistency of the population numbers is checked by the caller)
 		//	i: reaction channel index
 		{
 			using std::sqrt;
 
-			if (x[P] > ST)
-				throw std::domain_error("Current state "
-					+ std::to_string(x[P])
-					+ " is incompatible with constants of motion.");
 			switch (i)
 			{
 				case 0:
@@ -300,16 +728,20 @@ namespace gillespie
 			nu[0] = {1};
 		}
 
-		T a(std::size_t i) const final override
-		// propensity functions
+		bool consistent(const physics::vec<long long, num_species>& y) const noexcept final override
+		// return whether the population numbers y are non-negative and compatible with constants of motion
+		{
+			return base::consistent(y) && y[P] <= ST;
+		}
+
+	protected:
+
+		T propensity(std::size_t i) const final override
+		// propensity functions (the consistency of the population numbers is checked by the caller)
 		//	i: reaction channel index
 		{
 			using std::sqrt;
 
-			if (x[P] > ST)
-				throw std::domain_error("Current state "
-					+ std::to_string(x[P])
-					+ " is incompatible with constants of motion.");
 			switch (i)
 			{
 				case 0:
@@ -360,14 +792,18 @@ namespace gillespie
 			nu[d]  = { 0,  0, -1};
 		}
 
-		T a(std::size_t i) const final override
-		// propensity functions
+		bool consistent(const physics::vec<long long, num_species>& y) const noexcept final override
+		// return whether the population numbers y are non-negative and compatible with constants of motion
+		{
+			return base::consistent(y) && y[C] <= ET && y[CP] <= DT && y[SP] + y[C] + y[CP] <= ST;
+		}
+
+	protected:
+
+		T propensity(std::size_t i) const final override
+		// propensity functions (the consistency of the population numbers is checked by the caller)
 		//	i: reaction channel index
 		{
-			if (x[C] > ET || x[CP] > DT || x[SP] + x[C] + x[CP] > ST)
-				throw std::domain_error("Current state "
-					+ std::to_string(x[SP]) + ", " + std::to_string(x[C]) + ", " + std::to_string(x[CP])
-					+ " is incompatible with constants of motion.");
 			switch (i)
 			{
 				case fe:
@@ -422,14 +858,18 @@ namespace gillespie
 			nu[d]  = {-1};
 		}
 
-		T a(std::size_t i) const final override
-		// propensity functions
+		bool consistent(const physics::vec<long long, num_species>& y) const noexcept final override
+		// return whether the population numbers y are non-negative and compatible with constants of motion
+		{
+			return base::consistent(y) && y[SP_hat] <= ST;
+		}
+
+	protected:
+
+		T propensity(std::size_t i) const final override
+		// propensity functions (the consistency of the population numbers is checked by the caller)
 		//	i: reaction channel index
 		{
-			if (x[SP_hat] > ST)
-				throw std::domain_error("Current state "
-					+ std::to_string(x[SP_hat])
-					+ " is incompatible with constants of motion.");
 			switch (i)
 			{
 				case e:
@@ -487,14 +927,18 @@ namespace gillespie
 			nu[d]  = {-1};
 		}
 
-		T a(std::size_t i) const final override
-		// propensity functions
+		bool consistent(const physics::vec<long long, num_species>& y) const noexcept final override
+		// return whether the population numbers y are non-negative and compatible with constants of motion
+		{
+			return base::consistent(y) && y[SP] <= ST;
+		}
+
+	protected:
+
+		T propensity(std::size_t i) const final override
+		// propensity functions (the consistency of the population numbers is checked by the caller)
 		//	i: reaction channel index
 		{
-			if (x[SP] > ST)
-				throw std::domain_error("Current state "
-					+ std::to_string(x[SP])
-					+ " is incompatible with constants of motion.");
 			switch (i)
 			{
 				case e:
@@ -23,6 +23,9 @@ g++ -shared -static -std=c++20 -Wall -Wextra -pedantic -O3 -fmax-errors=1 -DMS_W
 
 #include <optional>
 #include <vector>
+#include <stdexcept> // length_error
+#include <string> // to_string
+#include <algorithm> // copy
 
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
@@ -87,7 +90,7 @@ void class_integ(py::class_<Class>& c)
 			runge_kutta::ralston4<> default_integ;
 			return simulate_integ(self, default_integ, dt, t_final, n_sampling, noreturn);
 		};
-	c.def("step", Class::template step<Integ>, py::arg("integ"), py::arg("dt"));
+	c.def("step", &Class::template step<Integ>, py::arg("integ"), py::arg("dt"));
 	c.def("simulate",
 		simulate_integ,
 		py::arg("integ"),
@@ -102,8 +105,10 @@ void class_integ(py::class_<Class>& c)
 		py::arg("n_sampling") = 1,
 		py::arg("noreturn") = false);
 	c.def_property("p",
-		[](const Class& self)
+		[](py::object py_self)
 		{
+			// return a view of the probabilities (no copy), which keeps py_self alive
+			Class& self = py_self.cast<Class&>();
 			std::array<long long, Class::num_species> shape, stride;
 			for (std::size_t i = 0; i < Class::num_species; ++i)
 				shape[i] = self.get_shape_index(i);
@@ -113,12 +118,16 @@ void class_integ(py::class_<Class>& c)
 			return py::array_t<double>(
 				shape,
 				stride,
-				&self.p[0]
+				&self.p[0],
+				py_self
 			);
 		},
 		[](Class& self, py::array_t<double, py::array::c_style | py::array::forcecast> py_array)
 		{
-			self.p = std::valarray<double>(py_array.data(), py_array.size());
+			// copy in place, so that views returned by the getter remain valid
+			if ((std::size_t)py_array.size() != self.p.size())
+				throw std::length_error("The probability array must have " + std::to_string(self.p.size()) + " elements.");
+			std::copy(py_array.data(), py_array.data() + py_array.size(), std::begin(self.p));
 		});
 	c.def_readwrite("t", &Class::t);
 }
@@ -127,10 +136,10 @@ template <typename Class>
 void class_defs(py::class_<Class>& c)
 {
 	class_integ<integrator<>>(c);
-	c.def("mean", Class::mean, py::arg("s_i"));
-	c.def("msq", Class::msq, py::arg("s_i"));
-	c.def("sd", Class::sd, py::arg("s_i"));
-	c.def("nth_moment", Class::nth_moment, py::arg("s_i"), py::arg("n"));
+	c.def("mean", &Class::mean, py::arg("s_i"));
+	c.def("msq", &Class::msq, py::arg("s_i"));
+	c.def("sd", &Class::sd, py::arg("s_i"));
+	c.def("nth_moment", &Class::nth_moment, py::arg("s_i"), py::arg("n"));
 }
 
 PYBIND11_MODULE(cme, m)
@@ -17,12 +17,18 @@
 /*
 
 Compilation (MinGW):
-g++ -shared -static -std=c++20 -Wall -Wextra -pedantic -O3 -fmax-errors=1 -DMS_WIN64 -fPIC -IC:\ProgramData\mambaforge\pkgs\pybind11-2.11.1-py311h005e61a_0\Lib\site-packages\pybind11\include -IC:\ProgramData\mambaforge\pkgs\python-3.11.5-h2628c8c_0_cpython\include -LC:\ProgramData\mambaforge\pkgs\python-3.11.5-h2628c8c_0_cpython\libs gillespie_pybind.cpp -o gillespie.pyd -lPython311
+g++ -shared -static -std=c++20 -Wall -Wextra -pedantic -O3 -fopenmp -fmax-errors=1 -DMS_WIN64 -fPIC -IC:\ProgramData\mambaforge\pkgs\pybind11-2.11.1-py311h005e61a_0\Lib\site-packages\pybind11\include -IC:\ProgramData\mambaforge\pkgs\python-3.11.5-h2628c8c_0_cpython\include -LC:\ProgramData\mambaforge\pkgs\python-3.11.5-h2628c8c_0_cpython\libs gillespie_pybind.cpp -o gillespie.pyd -lPython311
 
 */
 
 #include <optional>
 #include <vector>
+#include <stdexcept> // length_error
+#include <string> // to_string
+#include <random> // random_device
+#include <cstdint> // uint_fast64_t
+#include <memory> // unique_ptr, make_unique
+#include <utility> // move
 
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
@@ -33,10 +39,50 @@ g++ -shared -static -std=c++20 -Wall -Wextra -pedantic -O3 -fmax-errors=1 -DMS_W
 using namespace gillespie;
 namespace py = pybind11;
 
+template <typename Class>
+py::tuple states_to_tuple(std::unique_ptr<list_of_states<Class::num_species>> states_ptr)
+// return population numbers and times as a tuple of NumPy arrays, which take ownership of states
+{
+	py::capsule free_when_done(
+		states_ptr.get(),
+		[](void* f)
+		{
+			delete reinterpret_cast<list_of_states<Class::num_species>*>(f);
+		}
+	);
+	list_of_states<Class::num_species>* states = states_ptr.release(); // now owned by the capsule
+	return py::make_tuple<py::return_value_policy::take_ownership>(
+			py::array_t<long long>(
+				{(long long)states->x.size(), (long long)Class::num_species},
+				{(long long)(Class::num_species*sizeof(long long)), (long long)sizeof(long long)},
+				reinterpret_cast<long long*>(states->x.data()),
+				free_when_done
+			),
+			py::array_t<double>(
+				{states->t.size()},
+				{sizeof(double)},
+				states->t.data(),
+				free_when_done
+			)
+		);
+}
+
+template <typename Class>
+decltype(Class::x) to_state(const py::array_t<long long, py::array::c_style | py::array::forcecast>& py_array)
+// return population numbers from a NumPy array, checking its size
+{
+	if (py_array.size() != Class::num_species)
+		throw std::length_error("The state must have " + std::to_string(Class::num_species) + " elements.");
+
+	decltype(Class::x) x;
+	std::copy(py_array.data(), py_array.data() + py_array.size(), x.begin());
+	return x;
+}
+
 template <typename Class>
 void class_defs(py::class_<Class>& c)
 {
-	c.def("step", Class::step, py::arg("t_final") = 0.);
+	c.def("step", &Class::step, py::arg("t_final") = 0.);
 	c.def("simulate",
 		[](Class& self, double t_final, std::size_t max_steps, std::size_t n_sampling, bool noreturn) -> std::optional<py::tuple>
 		{
@@ -47,49 +93,101 @@ void class_defs(py::class_<Class>& c)
 			}
 			else
 			{
-				list_of_states<Class::num_species>* states = new list_of_states<Class::num_species>();
+				// owned by the unique_ptr until the simulation succeeds, so that it is freed if an exception is thrown
+				auto states = std::make_unique<list_of_states<Class::num_species>>();
 
 				self.simulate(*states, t_final, max_steps, n_sampling);
 
-				py::capsule free_when_done(
-					states,
-					[](void* f)
-					{
-						delete reinterpret_cast<list_of_states<Class::num_species>*>(f);
-					}
-				);
-				return py::make_tuple<py::return_value_policy::take_ownership>(
-						py::array_t<long long>(
-							{(long long)states->x.size(), (long long)Class::num_species},
-							{(long long)(Class::num_species*sizeof(long long)), (long long)sizeof(long long)},
-							reinterpret_cast<long long*>(states->x.data()),
-							free_when_done
-						),
-						py::array_t<double>(
-							{states->t.size()},
-							{sizeof(double)},
-							states->t.data(),
-							free_when_done
-						)
-					);
+				return states_to_tuple<Class>(std::move(states));
 			}
 		},
 		py::arg("t_final") = 0.,
 		py::arg("max_steps") = Class::default_max_steps(),
 		py::arg("n_sampling") = 1,
 		py::arg("noreturn") = false);
+	c.def("reset",
+		[](Class& self, py::array_t<long long, py::array::c_style | py::array::forcecast> init_x)
+		{
+			self.reset(to_state<Class>(init_x));
+		},
+		py::arg("init_x"));
+	c.def("leap", &Class::leap, py::arg("tau"), py::arg("t_final") = 0., py::arg("epsilon") = Class::default_epsilon());
+	c.def("simulate_tau_leap",
+		[](Class& self, double t_final, double tau, std::size_t max_steps, std::size_t n_sampling, double epsilon, bool noreturn) -> std::optional<py::tuple>
+		{
+			if (noreturn)
+			{
+				self.simulate_tau_leap(t_final, tau, max_steps, epsilon);
+				return {};
+			}
+			else
+			{
+				// owned by the unique_ptr until the simulation succeeds, so that it is freed if an exception is thrown
+				auto states = std::make_unique<list_of_states<Class::num_species>>();
+
+				self.simulate_tau_leap(*states, t_final, tau, max_steps, n_sampling, epsilon);
+
+				return states_to_tuple<Class>(std::move(states));
+			}
+		},
+		py::arg("t_final"),
+		py::arg("tau"),
+		py::arg("max_steps") = Class::default_max_steps(),
+		py::arg("n_sampling") = 1,
+		py::arg("epsilon") = Class::default_epsilon(),
+		py::arg("noreturn") = false);
+	c.def("simulate_batch",
+		[](const Class& self, std::size_t n_simulations, py::array_t<long long, py::array::c_style | py::array::forcecast> init_x, double t_final, std::size_t max_steps,
+			std::optional<std::uint_fast64_t> seed, int n_threads) -> py::array_t<double>
+		{
+			decltype(Class::x) x0 = to_state<Class>(init_x);
+
+			// owned by the unique_ptr until the batch succeeds, so that it is freed if an exception is thrown
+			auto completion_times = std::make_unique<std::vector<double>>();
+
+			if (!seed)
+				seed = std::random_device()();
+
+			{
+				py::gil_scoped_release release;
+				simulate_batch(self, *completion_times, n_simulations, x0, t_final, max_steps, *seed, n_threads);
+			}
+
+			py::capsule free_when_done(
+				completion_times.get(),
+				[](void* f)
+				{
+					delete reinterpret_cast<std::vector<double>*>(f);
+				}
+			);
+			std::vector<double>* data = completion_times.release(); // now owned by the capsule
+			return py::array_t<double>(
+				{data->size()},
+				{sizeof(double)},
+				data->data(),
+				free_when_done
+			);
+		},
+		py::arg("n_simulations"),
+		py::arg("init_x"),
+		py::arg("t_final") = 0.,
+		py::arg("max_steps") = Class::default_max_steps(),
+		py::arg("seed") = py::none(),
+		py::arg("n_threads") = 0);
 	c.def_property("x",
-		[](const Class& self)
+		[](py::object self)
 		{
+			// return a view of the population numbers (no copy), which keeps self alive
 			return py::array_t<long long>(
 				{(long long)Class::num_species},
 				{sizeof(long long)},
-				self.x.data()
+				self.cast<Class&>().x.data(),
+				self
 			);
 		},
 		[](Class& self, py::array_t<long long, py::array::c_style | py::array::forcecast> py_array)
 		{
-			std::copy(py_array.data(), py_array.data() + py_array.size(), self.x.begin());
+			self.x = to_state<Class>(py_array);
 		});
 	c.def_readwrite("t", &Class::t);
 }
@@ -17,13 +17,14 @@
 /*
 
 Compilation (GCC/MinGW):
-g++ tests/gillespie.cpp -o gillespie -std=c++20 -Wall -Wextra -pedantic -Ofast -fmax-errors=1
+g++ tests/gillespie.cpp -o gillespie -std=c++20 -Wall -Wextra -pedantic -Ofast -fopenmp -fmax-errors=1
 
 */
 
 #include <iostream> // cout
 #include <cassert>
 #include <cmath> // fabs
+#include <vector>
 
 #include "../include/sck/gillespie.hpp"
 
@@ -38,7 +39,7 @@ void test_gillespie_tqssa_prod()
 	std::size_t n = 10'000;
 	double kf = 10, kb = 9, kcat = 1, kM = (kb + kcat) / kf;
 	long long ET = 10, ST = 9;
-	double t = 2
+	double t = 2;
 	double P1 = 0, P2 = 0;
 
 	gillespie::single_substrate sys1(kf, kb, kcat, ET, ST);
@@ -107,10 +108,74 @@ void test_gillespie_tqssa_completion()
 	assert(fabs(t1 - t2) / t1 < .02); // not more than 2% relative error
 }
 
+void test_gillespie_tau_leap()
+// Test that the tau-leaping method agrees with the exact stochastic
+// simulation algorithm when the population numbers are large enough
+// that reactions are actually leaped over.
+// The test passes if the average products population at a certain
+// time agree within 1% relative error
+{
+	using std::fabs;
+
+	std::size_t n = 1'000;
+	double kf = 1e-3, kb = 9, kcat = 1;
+	long long ET = 1'000, ST = 10'000;
+	double t = 2, tau = 1;
+	double P1 = 0, P2 = 0;
+
+	gillespie::single_substrate sys(kf, kb, kcat, ET, ST);
+
+	for (std::size_t i = 0; i < n; ++i)
+	{
+		sys.x = 0;
+		sys.t = 0;
+		sys.simulate(t);
+		P1 += sys.x[sys.P];
+	}
+	P1 /= n;
+
+	for (std::size_t i = 0; i < n; ++i)
+	{
+		sys.x = 0;
+		sys.t = 0;
+		sys.simulate_tau_leap(t, tau);
+		P2 += sys.x[sys.P];
+	}
+	P2 /= n;
+
+	std::cout << P1 << '\n';
+	std::cout << P2 << '\n';
+
+	assert(fabs(P1 - P2) / P1 < .01); // not more than 1% relative error
+}
+
+void test_gillespie_batch_reproducible()
+// Test that a batch of simulations is reproducible given the seed,
+// independently of the number of threads.
+// The test passes if two batches with the same seed give the same
+// completion times, and a batch with a different seed does not
+{
+	std::size_t n = 1'000;
+	double kf = 10, kb = 9, kcat = 1;
+	long long ET = 10, ST = 9;
+	std::vector<double> t1, t2, t3;
+
+	gillespie::single_substrate sys(kf, kb, kcat, ET, ST);
+
+	gillespie::simulate_batch(sys, t1, n, sys.x, 0., sys.default_max_steps(), 42, 1);
+	gillespie::simulate_batch(sys, t2, n, sys.x, 0., sys.default_max_steps(), 42, 4);
+	gillespie::simulate_batch(sys, t3, n, sys.x, 0., sys.default_max_steps(), 43, 4);
+
+	assert(t1 == t2);
+	assert(t1 != t3);
+}
+
 int main()
 {
 	test_gillespie_tqssa_prod();
 	test_gillespie_tqssa_completion();
+	test_gillespie_tau_leap();
+	test_gillespie_batch_reproducible();
 
 	return 0;
 }